@@ -0,0 +1,345 @@
+"""Bulk export: fill many Firestore forms and stream them back as one ZIP or PDF.
+
+Documents are filled concurrently in a shared worker pool, but only `window`
+of them are in flight (or buffered) at any time, and each one is written to
+the output as soon as it is ready, so memory does not grow with the export
+size. Forms that fail to fill, and requested doc ids that were not found,
+are listed in errors.txt (ZIP) or on a final page (PDF).
+
+    python export.py --start 2025-01-01 --end 2025-02-01 -o january.zip
+    python export.py --doc-id abc --doc-id def --format pdf -o forms.pdf
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import real
+
+DEFAULT_WINDOW = 4
+POOL_WORKERS = DEFAULT_WINDOW
+MISSING = "not found in this office (or outside the date range)"
+
+_pool = None
+
+
+def _init_worker():
+    """Runs once in each pool process: heavy imports plus template fill plans."""
+    import warmup
+
+    try:
+        warmup.warm_up(connect=False)
+    except Exception as e:
+        # Each fill will report the real problem (e.g. a missing template).
+        print(f"⚠️ Worker warm-up failed: {e}")
+
+
+def get_pool():
+    """The process pool shared by every export.
+
+    Workers come from a forkserver, not a fork of this process, so they never
+    inherit a live Firestore gRPC channel or a half-read query stream.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=POOL_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+        )
+    return _pool
+
+
+def render_form(doc_id, data):
+    """Fill one document in its own scratch directory; returns (PDF bytes, seconds)."""
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix=f"form_{doc_id}_") as tmp:
+        pdf_path = real.fill_pdf_from_firestore(data, os.path.join(tmp, "filled_form.pdf"))
+        with open(pdf_path, "rb") as f:
+            return f.read(), time.perf_counter() - start
+
+
+def render_forms(docs, window=DEFAULT_WINDOW):
+    """Yield (doc_id, pdf_bytes, error, seconds) in query order.
+
+    At most `window` documents are rendering or waiting to be consumed, so a
+    slow consumer (e.g. a client download) throttles the workers.
+    """
+    pool = get_pool()
+    pending = deque()
+    try:
+        for doc_id, data in docs:
+            pending.append((doc_id, pool.submit(render_form, doc_id, data)))
+            if len(pending) >= window:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+    finally:
+        # The consumer went away (e.g. client disconnected): drop queued work.
+        for _, future in pending:
+            future.cancel()
+
+
+def _result(doc_id, future):
+    try:
+        pdf_bytes, seconds = future.result()
+        return doc_id, pdf_bytes, None, seconds
+    except Exception as e:
+        print(f"⚠️ Failed to fill {doc_id}: {e}")
+        return doc_id, None, str(e), None
+
+
+class _Pipe:
+    """Write-only, unseekable buffer that the ZIP writer appends to and we drain."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(results):
+    """Yield ZIP bytes as each filled form arrives; failed and missing forms go into errors.txt."""
+    pipe = _Pipe()
+    errors = []
+    with zipfile.ZipFile(pipe, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for doc_id, pdf_bytes, error, _ in results:
+            if error:
+                errors.append(f"{doc_id}: {error}")
+                continue
+            zf.writestr(f"{doc_id}.pdf", pdf_bytes)
+            yield pipe.drain()
+        if errors:
+            zf.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield pipe.drain()
+
+
+class _PdfStream:
+    """Writes one PDF incrementally from many source PDFs.
+
+    Object numbers 1 (catalog) and 2 (page tree) are reserved up front, so
+    each document's pages can point their /Parent at the page tree and be
+    written out immediately. Only byte offsets and page numbers are kept;
+    the page tree, catalog, xref and trailer are written by close().
+    """
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self):
+        self.pipe = _Pipe()
+        self.offset = 0
+        self.offsets = {}
+        self.kids = []
+        self.next_num = 3
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.pipe.write(data)
+        self.offset += len(data)
+
+    def _write_object(self, num, obj):
+        body = BytesIO()
+        obj.write_to_stream(body, None)
+        self.offsets[num] = self.offset
+        self._write(b"%d 0 obj\n" % num + body.getvalue() + b"\nendobj\n")
+
+    def add_document(self, pdf_bytes):
+        from PyPDF2 import PdfReader
+        from PyPDF2.generic import IndirectObject, NameObject, NullObject
+
+        reader = PdfReader(BytesIO(pdf_bytes))
+        numbers = {}
+        queue = deque()
+
+        def ref(indirect):
+            key = (indirect.idnum, indirect.generation)
+            if key not in numbers:
+                numbers[key] = self.next_num
+                self.next_num += 1
+                queue.append(indirect)
+            return IndirectObject(numbers[key], 0, None)
+
+        # reader.pages already carries inherited attributes (MediaBox,
+        # Resources, ...), so the pages stand on their own under a new parent.
+        pages = {}
+        for page in reader.pages:
+            kid = ref(page.indirect_reference)
+            pages[kid.idnum] = page
+            self.kids.append(kid)
+
+        while queue:
+            indirect = queue.popleft()
+            num = numbers[(indirect.idnum, indirect.generation)]
+            if num in pages:
+                obj = _copy_object(pages[num], ref, skip=("/Parent",))
+                obj[NameObject("/Parent")] = IndirectObject(self.PAGES, 0, None)
+            else:
+                source = indirect.get_object()
+                obj = NullObject() if source is None else _copy_object(source, ref)
+            self._write_object(num, obj)
+
+    def close(self):
+        from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+
+        self._write_object(self.PAGES, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(self.kids),
+            NameObject("/Count"): NumberObject(len(self.kids)),
+        }))
+        self._write_object(self.CATALOG, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(self.PAGES, 0, None),
+        }))
+
+        xref_offset = self.offset
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % self.next_num]
+        xref += [b"%010d 00000 n \n" % self.offsets[num] for num in range(1, self.next_num)]
+        self._write(b"".join(xref))
+        self._write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (self.next_num, self.CATALOG, xref_offset)
+        )
+
+
+def _copy_object(obj, ref, skip=()):
+    """Copy a PDF object, renumbering indirect references through `ref`."""
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        return ref(obj)
+    if isinstance(obj, StreamObject):
+        copy = obj.__class__()
+        copy.update({k: _copy_object(v, ref) for k, v in obj.items()})
+        copy._data = obj._data
+        return copy
+    if isinstance(obj, DictionaryObject):
+        return DictionaryObject({k: _copy_object(v, ref) for k, v in obj.items() if k not in skip})
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(_copy_object(v, ref) for v in obj)
+    return obj
+
+
+def _error_page(errors):
+    """A PDF listing the forms left out of an export, one line each."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    packet = BytesIO()
+    can = canvas.Canvas(packet, pagesize=letter)
+    page_width, page_height = letter
+    y = page_height - 72
+    for line in [f"{len(errors)} form(s) could not be exported:", ""] + errors:
+        if y < 72:
+            can.showPage()
+            y = page_height - 72
+        can.drawString(72, y, line[:100])
+        y -= 16
+    can.save()
+    return packet.getvalue()
+
+
+def stream_merged_pdf(results):
+    """Yield one concatenated PDF, writing each filled form as it arrives.
+
+    Failures are listed on a final page, since a PDF has no errors.txt.
+    """
+    out = _PdfStream()
+    yield out.pipe.drain()
+    errors = []
+    for doc_id, pdf_bytes, error, _ in results:
+        if error:
+            errors.append(f"{doc_id}: {error}")
+            continue
+        out.add_document(pdf_bytes)
+        yield out.pipe.drain()
+    if errors:
+        out.add_document(_error_page(errors))
+    out.close()
+    yield out.pipe.drain()
+
+
+FORMATS = {
+    "zip": (stream_zip, "application/zip"),
+    "pdf": (stream_merged_pdf, "application/pdf"),
+}
+
+
+def _record(results, sink, template):
+    """Pass results through, recording each one on the sink (see results.ResultSink)."""
+    for doc_id, pdf_bytes, error, seconds in results:
+        sink.record_export(doc_id, template, seconds, error)
+        yield doc_id, pdf_bytes, error, seconds
+
+
+def _report_missing(results, doc_ids):
+    """Pass results through, then report each requested doc id that never came back."""
+    seen = set()
+    for result in results:
+        seen.add(result[0])
+        yield result
+    for doc_id in doc_ids:
+        if doc_id not in seen:
+            print(f"⚠️ Not exported {doc_id}: {MISSING}")
+            yield doc_id, None, MISSING, None
+
+
+def export_forms(office=real.DEFAULT_OFFICE, start=None, end=None, doc_ids=None,
+                 fmt="zip", window=DEFAULT_WINDOW, sink=None):
+    """Return (byte chunk generator, mimetype) for the requested export.
+
+    The query is started here, before any bytes are produced, so bad dates
+    (ValueError) and credential / permission errors surface to the caller
+    instead of truncating a response that has already begun. With a sink,
+    every exported or failed form is recorded; requested doc_ids that don't
+    exist are reported in the export but not recorded.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    stream, mimetype = FORMATS[fmt]
+    docs = real.query_forms(office, start=start, end=end, doc_ids=doc_ids)
+    first = next(docs, None)
+    if first is not None:
+        docs = itertools.chain([first], docs)
+    results = render_forms(docs, window=window)
+    if sink is not None:
+        import pdfscraper
+
+        results = _record(results, sink, pdfscraper.template_hash(real.BASE_PDF))
+    if doc_ids:
+        results = _report_missing(results, doc_ids)
+    return stream(results), mimetype
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk export filled forms.")
+    parser.add_argument("--office", default=real.DEFAULT_OFFICE)
+    parser.add_argument("--start", help="inclusive ISO date, e.g. 2025-01-01")
+    parser.add_argument("--end", help="exclusive ISO date, e.g. 2025-02-01")
+    parser.add_argument("--doc-id", dest="doc_ids", action="append")
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="zip")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    chunks, _ = export_forms(args.office, args.start, args.end, args.doc_ids, args.fmt, args.window)
+    with open(args.output, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    print(f"✅ Export written to: {args.output}")
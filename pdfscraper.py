@@ -1,3 +1,4 @@
+import hashlib
 import pdfplumber
 from PyPDF2 import PdfReader, PdfWriter
 from io import BytesIO
@@ -5,16 +6,49 @@ import os
 from reportlab.pdfgen import canvas
 
 
-def fill_pdf1_2(input_path, output_path, name, is_adult=True):
-    """Auto-fills the 'Employee' or 'Patient' name field in a medical form PDF.
-       Uses hardcoded Yes/No bubble coordinates."""
+_templates = {}
+_name_plans = {}
+
+
+def _file_key(path):
+    """Cache key that changes whenever the file on disk does."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def load_template(path):
+    """Return the bytes of a template PDF, read once per version of the file."""
+    key = _file_key(path)
+    if key not in _templates:
+        with open(path, "rb") as f:
+            _templates[key] = f.read()
+    return _templates[key]
+
 
+def template_hash(path):
+    """sha256 of a template PDF, so results can say which version produced them."""
+    return hashlib.sha256(load_template(path)).hexdigest()
+
+
+def name_field_plan(input_path, is_adult=True):
+    """Locate the 'Employee' / 'Patient' name field in a template.
+
+    The text scoring and coordinate search only depend on the template, so
+    the result is computed once per template (and context) and cached.
+    Returns (page_index, (x, y), page_width, page_height), or None.
+    """
+    key = _file_key(input_path) + (is_adult,)
+    if key not in _name_plans:
+        _name_plans[key] = _find_name_field(BytesIO(load_template(input_path)), is_adult)
+    return _name_plans[key]
+
+
+def _find_name_field(source, is_adult):
     target_context = "employee" if is_adult else "patient"
-    found = False
     coords = None
     page_index = 0
 
-    with pdfplumber.open(input_path) as pdf:
+    with pdfplumber.open(source) as pdf:
         best_line = None
         best_score = -999
         best_page = 0
@@ -52,58 +86,65 @@ def fill_pdf1_2(input_path, output_path, name, is_adult=True):
                     best_line = line
                     best_page = i
 
-        if best_line:
-            found = True
-            page_index = best_page
-            print(f"Detected best match: '{best_line.strip()}' on page {page_index + 1}")
-
-            # Step 2: Find coordinates near the correct label
-            page = pdf.pages[page_index]
-            words = page.extract_words()
-
-            # Find y-position of the target context word ("patient" or "employee")
-            target_y = None
-            for w in words:
-                if target_context in w["text"].lower():
-                    target_y = w["top"]
-                    break
-
-            # Find the 'Name' word closest vertically to that
-            closest = None
-            min_diff = 9999
-            for w in words:
-                if "name" in w["text"].lower() and target_y:
-                    diff = abs(w["top"] - target_y)
-                    if diff < min_diff:
-                        min_diff = diff
-                        closest = w
-
-            if closest:
-                name_x = closest["x1"]
-                name_y = closest["top"]
-
-                # Find words on the same line after "Name"
-                right_side = [
-                    word for word in words
-                    if abs(word["top"] - name_y) < 5 and word["x0"] > closest["x1"]
-                ]
-                if right_side:
-                    farthest_right = max(right_side, key=lambda w: w["x1"])
-                    name_x = farthest_right["x1"] + 10  # small gap
-
-                coords = (name_x, name_y)
+        if not best_line:
+            return None
+
+        page_index = best_page
+        print(f"Detected best match: '{best_line.strip()}' on page {page_index + 1}")
+
+        # Step 2: Find coordinates near the correct label
+        page = pdf.pages[page_index]
+        words = page.extract_words()
+
+        # Find y-position of the target context word ("patient" or "employee")
+        target_y = None
+        for w in words:
+            if target_context in w["text"].lower():
+                target_y = w["top"]
+                break
+
+        # Find the 'Name' word closest vertically to that
+        closest = None
+        min_diff = 9999
+        for w in words:
+            if "name" in w["text"].lower() and target_y:
+                diff = abs(w["top"] - target_y)
+                if diff < min_diff:
+                    min_diff = diff
+                    closest = w
+
+        if closest:
+            name_x = closest["x1"]
+            name_y = closest["top"]
+
+            # Find words on the same line after "Name"
+            right_side = [
+                word for word in words
+                if abs(word["top"] - name_y) < 5 and word["x0"] > closest["x1"]
+            ]
+            if right_side:
+                farthest_right = max(right_side, key=lambda w: w["x1"])
+                name_x = farthest_right["x1"] + 10  # small gap
+
+            coords = (name_x, name_y)
+
+        if coords is None:
+            return None
+        return page_index, coords, page.width, page.height
+
+
+def fill_pdf1_2(input_path, output_path, name, is_adult=True):
+    """Auto-fills the 'Employee' or 'Patient' name field in a medical form PDF.
+       Uses hardcoded Yes/No bubble coordinates."""
+
+    plan = name_field_plan(input_path, is_adult)
 
     # Step 3: Write the name and fill Yes/No bubbles
-    if found and coords:
-        x, y = coords
+    if plan:
+        page_index, (x, y), page_width, page_height = plan
         label = "Employee Name" if is_adult else "Patient’s Name"
         print(f"Found '{label}' field at ({x:.0f}, {y:.0f})")
 
-        # Get page dimensions
-        with pdfplumber.open(input_path) as pdf_temp:
-            page_height = pdf_temp.pages[page_index].height
-            page_width = pdf_temp.pages[page_index].width
-
         # Draw overlay
         packet = BytesIO()
         can = canvas.Canvas(packet, pagesize=(page_width, page_height))
@@ -130,7 +171,7 @@ def fill_pdf1_2(input_path, output_path, name, is_adult=True):
 
         # Merge overlay
         new_pdf = PdfReader(packet)
-        existing_pdf = PdfReader(input_path)
+        existing_pdf = PdfReader(BytesIO(load_template(input_path)))
         output = PdfWriter()
 
         for i in range(len(existing_pdf.pages)):
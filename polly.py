@@ -1,13 +1,30 @@
 import boto3
 import os
 from dotenv import load_dotenv
-import pygame
 import tempfile
 import subprocess
 import speech_recognition as sr
 
 load_dotenv()
-pygame.mixer.init()
+
+_audio = None
+
+
+def get_audio():
+    """Import pygame and init its mixer on first playback, not at import."""
+    global _audio
+    if _audio is None:
+        import pygame
+
+        pygame.mixer.init()
+        _audio = pygame
+    return _audio
+
+
+def set_audio(module):
+    """Inject the audio backend (pygame or a stand-in with the same API)."""
+    global _audio
+    _audio = module
 
 def record_and_transcribe(duration=5):
     # Record audio using system command
@@ -51,6 +68,7 @@ def text_to_speech_and_play(text, voice_id='Joanna'):
         tmp_file.write(audio_data)
         tmp_file.flush()
         
+        pygame = get_audio()
         pygame.mixer.music.load(tmp_file.name)
         pygame.mixer.music.play()
         
@@ -1,16 +1,58 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import pdfscraper as pd
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
 
 # ---------------------------
-# 1. Initialize Firebase Admin
+# 1. Initialize Firebase Admin (lazily)
 # ---------------------------
+# Nothing touches Firebase at import time: workers, tests and CLI tools only
+# pay for credentials + the Firestore client when they actually need them.
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(r"C:\Users\ethan\Downloads\serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
+CREDENTIALS_ENV = "FIREBASE_CREDENTIALS"  # path to serviceAccountKey.json
+BASE_PDF = "medical_form.pdf"
+DEFAULT_OFFICE = "traneyes"
+OFFICES_ENV = "MEDDOC_OFFICES"  # comma-separated office ids this deployment serves
+SUBMITTED_AT = "submissionMetadata.submittedAt"  # ISO-8601 string set by the form
+SERVER_UPDATED_AT = "submissionMetadata.serverUpdatedAt"  # Firestore serverTimestamp()
 
-db = firestore.client()
+_db = None
+
+
+def init_firebase(cred_path=None):
+    """Initialize the default Firebase app once.
+
+    cred_path falls back to $FIREBASE_CREDENTIALS, then to Application
+    Default Credentials (GOOGLE_APPLICATION_CREDENTIALS / metadata server).
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if not firebase_admin._apps:
+        cred_path = cred_path or os.getenv(CREDENTIALS_ENV)
+        if cred_path:
+            cred = credentials.Certificate(cred_path)
+        else:
+            cred = credentials.ApplicationDefault()
+        firebase_admin.initialize_app(cred)
+
+
+def get_db():
+    """Return the shared Firestore client, creating it on first use."""
+    global _db
+    if _db is None:
+        from firebase_admin import firestore
+
+        init_firebase()
+        _db = firestore.client()
+    return _db
+
+
+def set_db(client):
+    """Inject a Firestore client (or a stand-in with the same API)."""
+    global _db
+    _db = client
 
 
 # ---------------------------
@@ -25,47 +67,137 @@ def yes_no_to_bool(value):
     return False
 
 
-def fetch_form_data():
-    """Fetch Firestore document data by ID."""
-    collection_ref = db.collection("Offices").document("traneyes").collection("forms")
-    docs = collection_ref.stream()
+def known_offices():
+    """Offices this deployment serves: $MEDDOC_OFFICES, or just the default one."""
+    offices = os.getenv(OFFICES_ENV, "")
+    return {office.strip() for office in offices.split(",") if office.strip()} or {DEFAULT_OFFICE}
+
+
+def forms_collection(office=DEFAULT_OFFICE):
+    return get_db().collection("Offices").document(office).collection("forms")
+
+
+def to_iso(ts):
+    """Format a datetime like JS Date.toISOString(), the format of submittedAt."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    ts = ts.astimezone(timezone.utc)
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts.microsecond // 1000:03d}Z"
+
+
+def iso_bound(value):
+    """Validate a YYYY-MM-DD date or ISO datetime for comparison with submittedAt.
+
+    submittedAt is compared as a string, so anything that isn't zero-padded
+    (e.g. "2025-1-5") is rejected and datetimes are normalized to UTC.
+    """
+    if not isinstance(value, str) or not re.match(r"^\d{4}-\d{2}-\d{2}(T|$)", value):
+        raise ValueError(f"Invalid date '{value}' (expected YYYY-MM-DD or an ISO datetime)")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}' (expected YYYY-MM-DD or an ISO datetime)")
+    return value if len(value) == 10 else to_iso(parsed)
+
+
+def query_forms(office=DEFAULT_OFFICE, start=None, end=None, doc_ids=None, updated_since=None):
+    """Yield (doc_id, data) for an office's forms.
+
+    start/end are ISO dates or datetimes compared against submittedAt
+    (start inclusive, end exclusive). doc_ids restricts the export to
+    those documents, fetched in one batched read and yielded in the
+    order given. updated_since (a datetime) keeps forms whose server-set
+    serverUpdatedAt is at or after it.
+    """
+    start = iso_bound(start) if start else None
+    end = iso_bound(end) if end else None
+    collection_ref = forms_collection(office)
+    if doc_ids:
+        refs = [collection_ref.document(doc_id) for doc_id in doc_ids]
+        # get_all returns documents in arbitrary order.
+        found = {doc.id: doc for doc in get_db().get_all(refs)}
+        docs = [found[doc_id] for doc_id in doc_ids if doc_id in found]
+    else:
+        query = collection_ref
+        if start:
+            query = query.where(SUBMITTED_AT, ">=", start)
+        if end:
+            query = query.where(SUBMITTED_AT, "<", end)
+        if updated_since:
+            query = query.where(SERVER_UPDATED_AT, ">=", updated_since)
+        docs = query.stream()
+
     for doc in docs:
-        if doc.exists:
-            print(f"📥 Retrieved Firestore data for {doc.id}")
-            document_data = doc.to_dict()
-            fill_pdf_from_firestore(document_data)
-        # print(f"Found document with ID: {doc.id}")
-    # if not doc.exists:
-    #     raise ValueError(f"No document found with ID {doc_id}")
-    # return doc.to_dict()
+        if not doc.exists:
+            continue
+        data = doc.to_dict()
+        if doc_ids and (start or end):
+            submitted = data.get("submissionMetadata", {}).get("submittedAt", "")
+            if (start and submitted < start) or (end and submitted >= end):
+                continue
+        yield doc.id, data
+
+
+def fetch_form_data():
+    """Fill every form in the office, store the PDFs and record the results.
+
+    Forms already rendered from the current template are skipped.
+    """
+    from results import render_and_record  # results imports this module
+
+    return render_and_record()
 
 
 # ---------------------------
 # 3. Firestore → PDF Mapping
 # ---------------------------
-def fill_pdf_from_firestore(data):
+def form_version(data):
+    """Fingerprint of a form's content; changes whenever the form is edited."""
+    encoded = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
 
+def extract_fields(data):
+    """Flatten a Firestore form into the values the PDF (and reports) use."""
     emp = data.get("employeeInformation", {})
     pat = data.get("patientInformation", {})
     med = data.get("medicalCondition", {})
     work = data.get("workCapacity", {})
     care = data.get("careRequirements", {})
 
-    # --- Map fields ---
-    name = emp.get("fullName", "")
-    is_self = pat.get("isFamilyMember", "No").strip().lower() == "no"
-    date_answer = med.get("dateCommenced", "")
-    reason = med.get("probableDuration", "")
-    serious_condition = yes_no_to_bool(med.get("isSeriousHealthCondition"))
     work_status = yes_no_to_bool(work.get("employeeAbleToWork"))
-    activity = work_status  # same as work
-    basic_needs = yes_no_to_bool(care.get("patientRequiresAssistance"))
-    need_help = yes_no_to_bool(care.get("needsFurtherHelp"))
+    return {
+        "name": emp.get("fullName", ""),
+        # The form stores null until the question is answered.
+        "is_self": (pat.get("isFamilyMember") or "No").strip().lower() == "no",
+        "date_answer": med.get("dateCommenced", ""),
+        "reason": med.get("probableDuration", ""),
+        "serious_condition": yes_no_to_bool(med.get("isSeriousHealthCondition")),
+        "work_status": work_status,
+        "activity": work_status,  # same as work
+        "basic_needs": yes_no_to_bool(care.get("patientRequiresAssistance")),
+        "need_help": yes_no_to_bool(care.get("needsFurtherHelp")),
+    }
+
+
+def fill_pdf_from_firestore(data, final_pdf="filled_form.pdf"):
+    import pdfscraper as pd
+
+    # --- Map fields ---
+    fields = extract_fields(data)
+    name = fields["name"]
+    is_self = fields["is_self"]
+    date_answer = fields["date_answer"]
+    reason = fields["reason"]
+    serious_condition = fields["serious_condition"]
+    work_status = fields["work_status"]
+    activity = fields["activity"]
+    basic_needs = fields["basic_needs"]
+    need_help = fields["need_help"]
 
     # --- File paths ---
-    base_pdf = "medical_form.pdf"
-    temp_pdf = "filled_form_temp.pdf"
-    final_pdf = "filled_form.pdf"
+    base_pdf = BASE_PDF
+    temp_pdf = os.path.splitext(final_pdf)[0] + "_temp.pdf"
 
     # --- Fill PDF ---
     pd.fill_pdf1_2(base_pdf, temp_pdf, name, is_adult=is_self)
@@ -0,0 +1,291 @@
+"""Record what was rendered: artifact storage plus batched Firestore write-back.
+
+Each batch run fills the queried forms (export.render_forms), uploads the
+PDFs to an artifact store, and records status, output location, template
+hash, form version and timing under Offices/<office>/renders/<docId>.
+Results are written with Firestore batches instead of one round trip per
+document, and forms already rendered from the current template and form
+content are skipped.
+
+    python results.py --start 2025-01-01 --end 2025-02-01 --out rendered
+"""
+import argparse
+import atexit
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import real
+from export import DEFAULT_WINDOW, render_forms
+
+FIRESTORE_BATCH_LIMIT = 500
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+# Results kept for retry while Firestore is failing; the oldest are dropped beyond this.
+MAX_PENDING = 10 * FIRESTORE_BATCH_LIMIT
+DEFAULT_UPLOADS = 8
+
+
+def template_hash(path=real.BASE_PDF):
+    import pdfscraper  # PDF libraries load on first use, not with the server
+
+    return pdfscraper.template_hash(path)
+
+
+# ---------------------------
+# Artifact stores
+# ---------------------------
+class LocalArtifactStore:
+    """Stores artifacts as files under a root directory.
+
+    put() is safe to call from many threads: each write goes to its own temp
+    file and is atomically renamed into place.
+    """
+
+    def __init__(self, root="rendered"):
+        self.root = os.path.abspath(root)
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return path
+
+
+# ---------------------------
+# Firestore result sink
+# ---------------------------
+class ResultSink:
+    """Buffers render results and commits them in Firestore batches.
+
+    A batch is committed as soon as batch_size results are pending, by a
+    background thread every flush_interval seconds, and on close(). record()
+    may be called from any thread and never raises: when a commit fails the
+    results are re-queued (at most max_pending) and retried in the background.
+    """
+
+    def __init__(self, office=real.DEFAULT_OFFICE, db=None,
+                 batch_size=FIRESTORE_BATCH_LIMIT, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING):
+        if not 0 < batch_size <= FIRESTORE_BATCH_LIMIT:
+            raise ValueError(f"batch_size must be between 1 and {FIRESTORE_BATCH_LIMIT}")
+        self.db = db or real.get_db()
+        self.collection = self.db.collection("Offices").document(office).collection("renders")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = []
+        self.commits = 0
+        self.dropped = 0
+        self._retry_at = 0.0  # after a failed commit, size flushes wait until then
+        self._lock = threading.Lock()  # guards pending
+        self._commit_lock = threading.Lock()  # one commit at a time
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self._try_flush()
+
+    def _try_flush(self):
+        try:
+            self.flush()
+            return True
+        except Exception as e:
+            print(f"⚠️ Failed to record render results (will retry): {e}")
+            return False
+
+    def record(self, doc_id, status, location=None, template=None, seconds=None, error=None,
+               form=None):
+        result = {
+            "status": status,
+            "location": location,
+            "templateHash": template,
+            "formVersion": form,
+            "renderSeconds": seconds,
+            "error": error,
+            "recordedAt": datetime.now(timezone.utc),
+        }
+        self._add(doc_id, result)
+
+    def record_export(self, doc_id, template=None, seconds=None, error=None):
+        """Note an export under lastExport, leaving the render record untouched."""
+        self._add(doc_id, {"lastExport": {
+            "status": "failed" if error else "exported",
+            "templateHash": template,
+            "renderSeconds": seconds,
+            "error": error,
+            "recordedAt": datetime.now(timezone.utc),
+        }})
+
+    def _add(self, doc_id, result):
+        with self._lock:
+            self.pending.append((doc_id, result))
+            full = len(self.pending) >= self.batch_size
+        if full and time.monotonic() >= self._retry_at:
+            self._try_flush()
+
+    def flush(self):
+        with self._commit_lock:
+            with self._lock:
+                pending, self.pending = self.pending, []
+            while pending:
+                chunk = pending[:self.batch_size]
+                batch = self.db.batch()
+                for doc_id, result in chunk:
+                    batch.set(self.collection.document(doc_id), result, merge=True)
+                try:
+                    batch.commit()
+                except Exception:
+                    self._requeue(pending)
+                    raise
+                pending = pending[self.batch_size:]
+                self.commits += 1
+                print(f"📤 Recorded {len(chunk)} render results")
+            self._retry_at = 0.0
+
+    def _requeue(self, results):
+        """Put uncommitted results back in front of anything recorded meanwhile."""
+        with self._lock:
+            self.pending[:0] = results
+            overflow = len(self.pending) - self.max_pending
+            if overflow > 0:
+                del self.pending[:overflow]
+                self.dropped += overflow
+                print(f"⚠️ Dropped {overflow} unrecorded render results (Firestore unavailable)")
+        self._retry_at = time.monotonic() + self.flush_interval
+
+    def rendered_versions(self, template):
+        """{doc_id: formVersion} for forms already rendered from this template version."""
+        query = self.collection.where("status", "==", "rendered").where("templateHash", "==", template)
+        return {doc.id: doc.to_dict().get("formVersion") for doc in query.stream()}
+
+    def rendered_location(self, doc_id, template, form):
+        """Where this version of a form, rendered from this template, was stored, or None."""
+        doc = self.collection.document(doc_id).get()
+        if not doc.exists:
+            return None
+        result = doc.to_dict()
+        if (result.get("status") == "rendered" and result.get("templateHash") == template
+                and result.get("formVersion") == form):
+            return result.get("location")
+        return None
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        self._try_flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_sinks = {}
+
+
+def get_sink(office=real.DEFAULT_OFFICE):
+    """Long-lived sink for a server process, flushed in the background and at exit.
+
+    Only known offices get one, so request input can't start unbounded threads.
+    """
+    if office not in real.known_offices():
+        raise ValueError(f"Unknown office '{office}'")
+    if office not in _sinks:
+        _sinks[office] = ResultSink(office)
+        atexit.register(_sinks[office].close)
+    return _sinks[office]
+
+
+# ---------------------------
+# Batch run
+# ---------------------------
+def render_and_record(office=real.DEFAULT_OFFICE, start=None, end=None, doc_ids=None,
+                      store=None, sink=None, window=DEFAULT_WINDOW, uploads=DEFAULT_UPLOADS,
+                      force=False):
+    """Fill every matching form, upload it, and record the outcome.
+
+    Forms already rendered from the current template, and not edited since,
+    are skipped unless force=True. Returns (rendered, failed, skipped) counts.
+    """
+    store = store or LocalArtifactStore()
+    own_sink = sink is None
+    sink = sink or ResultSink(office)
+    template = template_hash()
+    done = {} if force else sink.rendered_versions(template)
+    versions = {}
+    rendered = failed = skipped = 0
+
+    def pending_docs():
+        nonlocal skipped
+        for doc_id, data in real.query_forms(office, start=start, end=end, doc_ids=doc_ids):
+            version = real.form_version(data)
+            if done.get(doc_id) == version:
+                skipped += 1
+                continue
+            versions[doc_id] = version
+            yield doc_id, data
+
+    def finish(doc_id, future, seconds):
+        nonlocal rendered, failed
+        try:
+            location = future.result()
+        except Exception as e:
+            print(f"⚠️ Upload failed for {doc_id}: {e}")
+            sink.record(doc_id, "failed", template=template, seconds=seconds, error=str(e),
+                        form=versions.pop(doc_id))
+            failed += 1
+            return
+        sink.record(doc_id, "rendered", location, template, seconds, form=versions.pop(doc_id))
+        rendered += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=uploads) as pool:
+            in_flight = deque()
+            for doc_id, pdf_bytes, error, seconds in render_forms(pending_docs(), window=window):
+                if error:
+                    sink.record(doc_id, "failed", template=template, error=error,
+                                form=versions.pop(doc_id))
+                    failed += 1
+                    continue
+                in_flight.append((doc_id, pool.submit(store.put, f"{office}/{doc_id}.pdf", pdf_bytes), seconds))
+                if len(in_flight) >= uploads:
+                    finish(*in_flight.popleft())
+            while in_flight:
+                finish(*in_flight.popleft())
+    finally:
+        if own_sink:
+            sink.close()
+        else:
+            sink._try_flush()
+
+    print(f"✅ Batch done: {rendered} rendered, {failed} failed, {skipped} already rendered")
+    return rendered, failed, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill forms, store the PDFs and record results.")
+    parser.add_argument("--office", default=real.DEFAULT_OFFICE)
+    parser.add_argument("--start", help="inclusive ISO date, e.g. 2025-01-01")
+    parser.add_argument("--end", help="exclusive ISO date, e.g. 2025-02-01")
+    parser.add_argument("--doc-id", dest="doc_ids", action="append")
+    parser.add_argument("--out", default="rendered", help="local artifact directory")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--force", action="store_true", help="re-render forms already rendered")
+    args = parser.parse_args()
+
+    render_and_record(args.office, args.start, args.end, args.doc_ids,
+                      store=LocalArtifactStore(args.out), window=args.window, force=args.force)
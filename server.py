@@ -1,27 +1,86 @@
-from flask import Flask, request, jsonify
-import firebase_admin
-from firebase_admin import credentials, firestore
-from real import fill_pdf_from_firestore  # reuse your function
-from firebase_admin import firestore
-
-db = firestore.client()
+import os
+from flask import Flask, Response, request, jsonify, stream_with_context
+from real import BASE_PDF, DEFAULT_OFFICE, form_version, known_offices, query_forms
+from export import FORMATS, export_forms, render_form
+from results import LocalArtifactStore, get_sink, template_hash
 
 # --- Flask app ---
 app = Flask(__name__)
+store = LocalArtifactStore()
 
 @app.route("/fill-pdf", methods=["POST"])
 def fill_pdf():
-    body = request.get_json()
+    body = request.get_json() or {}
     doc_id = body.get("docId")
+    office = body.get("office", DEFAULT_OFFICE)
     if not doc_id:
         return jsonify({"error": "Missing docId"}), 400
+    if office not in known_offices():
+        return jsonify({"error": f"Unknown office '{office}'"}), 400
 
     try:
-        pdf_path = fill_pdf_from_firestore(doc_id)
-        return jsonify({"message": "PDF generated", "file": pdf_path})
+        sink = get_sink(office)
+        doc = next(query_forms(office, doc_ids=[doc_id]), None)
+        if doc is None:
+            return jsonify({"error": f"No document found with ID {doc_id}"}), 404
+
+        template = template_hash(BASE_PDF)
+        form = form_version(doc[1])
+        # Same template and the form hasn't been edited: hand back the stored copy.
+        location = sink.rendered_location(doc_id, template, form)
+        if location:
+            return jsonify({"message": "PDF already generated", "file": location})
+
+        try:
+            pdf_bytes, seconds = render_form(*doc)
+            location = store.put(f"{office}/{doc_id}.pdf", pdf_bytes)
+        except Exception as e:
+            sink.record(doc_id, "failed", template=template, error=str(e), form=form)
+            raise
+        sink.record(doc_id, "rendered", location, template, seconds, form=form)
+        return jsonify({"message": "PDF generated", "file": location})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/export", methods=["POST"])
+def export():
+    body = request.get_json() or {}
+    fmt = body.get("format", "zip")
+    office = body.get("office", DEFAULT_OFFICE)
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}'"}), 400
+    if office not in known_offices():
+        return jsonify({"error": f"Unknown office '{office}'"}), 400
+
+    # export_forms starts the query before returning, so bad input and
+    # Firestore errors are reported here rather than mid-download.
+    try:
+        chunks, mimetype = export_forms(
+            office=office,
+            start=body.get("start"),
+            end=body.get("end"),
+            doc_ids=body.get("docIds"),
+            fmt=fmt,
+            sink=get_sink(office),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=forms.{fmt}"},
+    )
+
+
 if __name__ == "__main__":
+    from warmup import warm_up
+
+    # With debug=True the reloader re-runs this module; only warm the child
+    # that actually serves requests, not the file watcher.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_up()
     app.run(port=5001, debug=True)
@@ -0,0 +1,220 @@
+"""Columnar (Parquet) snapshot of submitted forms for reporting.
+
+Each form is flattened with the same mapping the PDF filler uses
+(real.extract_fields) and written to a directory of Parquet files. Updates
+only read documents whose server-set serverUpdatedAt is at or after the
+newest one already in the snapshot (minus a small overlap), so reports never
+need a full collection read; snapshots of older forms without that field
+fall back to submittedAt. Rows are upserts keyed by doc_id: when a form
+appears in several parts, the most recently written part wins on read.
+Unchanged rows are not rewritten, and once there are more than MAX_PARTS
+files they are compacted into one.
+
+    python snapshot.py update forms_snapshot
+    python snapshot.py update forms_snapshot --full   # re-read everything
+    python snapshot.py compact forms_snapshot
+    python snapshot.py weekly forms_snapshot --by serious_condition
+"""
+import argparse
+import glob
+import os
+import time
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import real
+
+DEFAULT_PATH = "forms_snapshot"
+ROWS_PER_FILE = 50_000
+MAX_PARTS = 16
+# Re-read a little before the watermark: commits with slightly earlier server
+# timestamps can become visible after later ones. Upserts make this harmless.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+SCHEMA = pa.schema([
+    ("doc_id", pa.string()),
+    ("version", pa.int64()),  # when the row was written; the latest wins
+    ("server_updated_at", pa.timestamp("us", tz="UTC")),
+    ("submitted_at", pa.timestamp("ms", tz="UTC")),
+    ("name", pa.string()),
+    ("is_self", pa.bool_()),
+    ("date_answer", pa.string()),
+    ("reason", pa.string()),
+    ("serious_condition", pa.bool_()),
+    ("work_status", pa.bool_()),
+    ("activity", pa.bool_()),
+    ("basic_needs", pa.bool_()),
+    ("need_help", pa.bool_()),
+])
+
+
+def _parse_submitted_at(data):
+    value = data.get("submissionMetadata", {}).get("submittedAt")
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def flatten(doc_id, data):
+    row = {
+        "doc_id": doc_id,
+        "server_updated_at": data.get("submissionMetadata", {}).get("serverUpdatedAt"),
+        "submitted_at": _parse_submitted_at(data),
+    }
+    row.update(real.extract_fields(data))
+    return row
+
+
+def _latest(table):
+    """Keep only the most recently written row for each doc_id."""
+    table = table.set_column(
+        table.schema.get_field_index("version"), "version", pc.fill_null(table["version"], 0)
+    )
+    newest = table.group_by("doc_id").aggregate([("version", "max")])
+    newest = pa.table({"doc_id": newest["doc_id"], "version": newest["version_max"]})
+    return table.join(newest, keys=["doc_id", "version"], join_type="inner")
+
+
+def load_snapshot(path=DEFAULT_PATH, columns=None, filter=None):
+    """Read the current snapshot (or just some columns / rows) into an Arrow table.
+
+    filter is applied after de-duplication, so it only ever sees the latest
+    version of each form.
+    """
+    if not os.path.isdir(path):
+        table = SCHEMA.empty_table()
+        return table.select(columns) if columns else table
+
+    read = None
+    if columns and filter is None:
+        read = list(dict.fromkeys(["doc_id", "version"] + list(columns)))
+    table = _latest(ds.dataset(path, schema=SCHEMA, format="parquet").to_table(columns=read))
+    if filter is not None:
+        table = table.filter(filter)
+    return table.select(columns) if columns else table
+
+
+def _parts(path):
+    return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+
+def _changed(rows, known):
+    """The rows that differ from the stored version of the same form."""
+    fresh = pa.Table.from_pylist(rows, schema=SCHEMA).drop_columns(["version"])
+    stored = known.filter(pc.is_in(known["doc_id"], value_set=fresh["doc_id"]))
+    stored = {row["doc_id"]: row for row in stored.drop_columns(["version"]).to_pylist()}
+    return [row for row in fresh.to_pylist() if stored.get(row["doc_id"]) != row]
+
+
+def _write_part(path, rows):
+    version = time.time_ns()
+    for row in rows:
+        row["version"] = version
+    table = pa.Table.from_pylist(rows, schema=SCHEMA)
+    part = os.path.join(path, f"part-{version}.parquet")
+    pq.write_table(table, part)
+    print(f"💾 Wrote {len(rows)} rows to {part}")
+
+
+def update_snapshot(path=DEFAULT_PATH, office=real.DEFAULT_OFFICE, full=False):
+    """Upsert forms written since the last update; returns the number of rows written.
+
+    full=True re-reads the whole collection, e.g. to pick up old forms that
+    predate serverUpdatedAt.
+    """
+    os.makedirs(path, exist_ok=True)
+    known = load_snapshot(path)
+
+    since = start = None
+    if not full and known.num_rows:
+        newest = pc.max(known["server_updated_at"]).as_py()
+        if newest is not None:
+            since = newest - WATERMARK_OVERLAP
+        else:
+            # No form carries serverUpdatedAt yet: use the browser-set
+            # submittedAt rather than re-reading the whole collection.
+            newest = pc.max(known["submitted_at"]).as_py()
+            if newest is not None:
+                start = real.to_iso(newest - WATERMARK_OVERLAP)
+
+    written = 0
+    rows = []
+
+    def write_changed():
+        nonlocal written
+        changed = _changed(rows, known)
+        if changed:
+            _write_part(path, changed)
+            written += len(changed)
+
+    for doc_id, data in real.query_forms(office, start=start, updated_since=since):
+        rows.append(flatten(doc_id, data))
+        if len(rows) >= ROWS_PER_FILE:
+            write_changed()
+            rows = []
+    if rows:
+        write_changed()
+
+    if len(_parts(path)) > MAX_PARTS:
+        compact_snapshot(path)
+
+    print(f"✅ Snapshot updated: {written} forms written")
+    return written
+
+
+def compact_snapshot(path=DEFAULT_PATH):
+    """Rewrite the latest row of every form into a single part; returns the parts removed."""
+    parts = _parts(path)
+    if len(parts) <= 1:
+        return 0
+    table = load_snapshot(path).select(SCHEMA.names)
+    # Files starting with "_" are ignored by readers until the rename.
+    tmp = os.path.join(path, "_compact.parquet")
+    pq.write_table(table, tmp)
+    os.replace(tmp, os.path.join(path, f"part-{time.time_ns()}.parquet"))
+    for part in parts:
+        os.remove(part)
+    print(f"🗜 Compacted {len(parts)} parts into one ({table.num_rows} forms)")
+    return len(parts)
+
+
+def weekly_counts(table, column):
+    """Count forms per (week, value of column), weeks starting Monday."""
+    week = pc.floor_temporal(table["submitted_at"], unit="week", week_starts_monday=True)
+    table = table.select(["doc_id", column]).append_column("week", week)
+    counts = table.group_by(["week", column]).aggregate([("doc_id", "count")])
+    return counts.rename_columns(["week", column, "count"]).sort_by([("week", "ascending"), (column, "ascending")])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar snapshot of submitted forms.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    update = sub.add_parser("update", help="upsert new and edited forms")
+    update.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    update.add_argument("--office", default=real.DEFAULT_OFFICE)
+    update.add_argument("--full", action="store_true", help="re-read the whole collection")
+
+    compact = sub.add_parser("compact", help="rewrite the latest rows into one file")
+    compact.add_argument("path", nargs="?", default=DEFAULT_PATH)
+
+    weekly = sub.add_parser("weekly", help="count forms per week by a column")
+    weekly.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    weekly.add_argument("--by", dest="column", default="serious_condition")
+
+    args = parser.parse_args()
+    if args.command == "update":
+        update_snapshot(args.path, args.office, args.full)
+    elif args.command == "compact":
+        compact_snapshot(args.path)
+    else:
+        table = load_snapshot(args.path, columns=["doc_id", "submitted_at", args.column])
+        for row in weekly_counts(table, args.column).to_pylist():
+            print(f"{row['week']:%Y-%m-%d}  {args.column}={row[args.column]}  {row['count']}")
@@ -1,4 +1,4 @@
-import { addDoc, collection } from "firebase/firestore";
+import { addDoc, collection, serverTimestamp } from "firebase/firestore";
 import { auth, db } from "./initialize";
 
 export async function uploadDocument(upload){
@@ -14,6 +14,15 @@ export async function uploadDocument(upload){
         
         // Ensure upload data is a plain object and doesn't contain undefined values
         const sanitizedUpload = JSON.parse(JSON.stringify(upload));
+
+        // Server-set timestamps (added after sanitizing, which would strip the
+        // sentinels). Reporting syncs on serverUpdatedAt because submittedAt
+        // comes from the browser clock; anything that edits a form must bump it.
+        sanitizedUpload.submissionMetadata = {
+            ...sanitizedUpload.submissionMetadata,
+            serverSubmittedAt: serverTimestamp(),
+            serverUpdatedAt: serverTimestamp()
+        };
         
         const docRef = collection(db, "Offices", "traneyes", "forms");
         await addDoc(docRef, sanitizedUpload);
@@ -0,0 +1,121 @@
+import operator
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import real  # noqa: E402
+
+OPS = {
+    "==": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _field(data, path):
+    for key in path.split("."):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeQuery(self.db, f"{self.path}/{name}")
+
+    def get(self):
+        return FakeSnapshot(self.id, self.db.docs.get(self.path))
+
+    def set(self, data, merge=False):
+        current = self.db.docs.get(self.path, {}) if merge else {}
+        self.db.docs[self.path] = {**current, **data}
+
+
+class FakeQuery:
+    """Collection reference / query: equality and range filters on dotted paths."""
+
+    def __init__(self, db, path, filters=()):
+        self.db = db
+        self.path = path
+        self.filters = filters
+
+    def document(self, doc_id):
+        return FakeDocument(self.db, f"{self.path}/{doc_id}")
+
+    def where(self, field, op, value):
+        return FakeQuery(self.db, self.path, self.filters + ((field, OPS[op], value),))
+
+    def stream(self):
+        self.db.queries.append((self.path, self.filters))
+        for path, data in list(self.db.docs.items()):
+            parent, doc_id = path.rsplit("/", 1)
+            if parent != self.path:
+                continue
+            # Like Firestore, a document missing a filtered field never matches.
+            values = [(_field(data, field), op, value) for field, op, value in self.filters]
+            if all(v is not None and op(v, value) for v, op, value in values):
+                yield FakeSnapshot(doc_id, data)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data, merge))
+
+    def commit(self):
+        for ref, data, merge in self.writes:
+            ref.set(data, merge=merge)
+        self.db.commits.append(len(self.writes))
+
+
+class FakeFirestore:
+    """Just enough of google.cloud.firestore.Client for these modules."""
+
+    def __init__(self):
+        self.docs = {}
+        self.commits = []
+        self.queries = []
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def add_form(self, doc_id, data, office=real.DEFAULT_OFFICE):
+        self.docs[f"Offices/{office}/forms/{doc_id}"] = data
+
+
+@pytest.fixture
+def fake_db():
+    db = FakeFirestore()
+    real.set_db(db)
+    yield db
+    real.set_db(None)
@@ -0,0 +1,56 @@
+import zipfile
+from io import BytesIO
+
+import pytest
+
+PyPDF2 = pytest.importorskip("PyPDF2")
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+
+import export  # noqa: E402
+
+
+def one_page_pdf(text):
+    packet = BytesIO()
+    can = canvas.Canvas(packet)
+    can.drawString(72, 720, text)
+    can.save()
+    return packet.getvalue()
+
+
+@pytest.fixture
+def forms(fake_db, monkeypatch):
+    fake_db.add_form("a", {"employeeInformation": {"fullName": "Ann"}})
+    fake_db.add_form("b", {"employeeInformation": {"fullName": "Bob"}})
+
+    def fake_render_forms(docs, window):
+        for doc_id, _ in docs:
+            if doc_id == "b":
+                yield doc_id, None, "template missing", None
+            else:
+                yield doc_id, one_page_pdf(f"form {doc_id}"), None, 0.01
+
+    monkeypatch.setattr(export, "render_forms", fake_render_forms)
+
+
+def test_zip_lists_failed_and_missing_doc_ids(forms):
+    chunks, _ = export.export_forms(doc_ids=["a", "gone", "b"], fmt="zip")
+    with zipfile.ZipFile(BytesIO(b"".join(chunks))) as zf:
+        assert zf.namelist() == ["a.pdf", "errors.txt"]
+        assert zf.read("errors.txt").decode() == f"b: template missing\ngone: {export.MISSING}\n"
+
+
+def test_merged_pdf_ends_with_error_page(forms):
+    chunks, _ = export.export_forms(doc_ids=["a", "gone", "b"], fmt="pdf")
+    pages = PyPDF2.PdfReader(BytesIO(b"".join(chunks))).pages
+
+    assert len(pages) == 2
+    assert "form a" in pages[0].extract_text()
+    errors = pages[1].extract_text()
+    assert "2 form(s) could not be exported" in errors
+    assert "b: template missing" in errors
+    assert "gone: not found" in errors
+
+
+def test_merged_pdf_without_errors_has_no_error_page(forms):
+    chunks, _ = export.export_forms(doc_ids=["a"], fmt="pdf")
+    assert len(PyPDF2.PdfReader(BytesIO(b"".join(chunks))).pages) == 1
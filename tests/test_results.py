@@ -0,0 +1,129 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+import real  # noqa: E402
+import results  # noqa: E402
+
+RENDERS = "Offices/traneyes/renders"
+
+
+def test_sink_commits_at_batch_size_and_on_close(fake_db):
+    sink = results.ResultSink(db=fake_db, batch_size=3, flush_interval=3600)
+    for i in range(7):
+        sink.record(f"d{i}", "rendered", f"/out/d{i}.pdf", "abc", 0.1)
+    assert fake_db.commits == [3, 3]
+
+    sink.close()
+    assert fake_db.commits == [3, 3, 1]
+    assert fake_db.docs[f"{RENDERS}/d6"]["location"] == "/out/d6.pdf"
+    assert fake_db.docs[f"{RENDERS}/d6"]["templateHash"] == "abc"
+
+
+def test_export_record_keeps_render_record(fake_db):
+    with results.ResultSink(db=fake_db, flush_interval=3600) as sink:
+        sink.record("d0", "rendered", "/out/d0.pdf", "abc", 0.1)
+        sink.record_export("d0", "abc", 0.2)
+
+    record = fake_db.docs[f"{RENDERS}/d0"]
+    assert record["status"] == "rendered"
+    assert record["location"] == "/out/d0.pdf"
+    assert record["lastExport"]["status"] == "exported"
+
+
+def test_sink_flushes_in_background(fake_db):
+    sink = results.ResultSink(db=fake_db, batch_size=500, flush_interval=0.05)
+    sink.record("d0", "rendered", "/out/d0.pdf", "abc", 0.1)
+
+    deadline = time.monotonic() + 2
+    while not fake_db.commits and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fake_db.commits == [1]
+    sink.close()
+    assert fake_db.commits == [1]
+
+
+def test_artifact_store_concurrent_puts(tmp_path):
+    store = results.LocalArtifactStore(tmp_path)
+    payloads = [bytes([i]) * 200_000 for i in range(16)]
+
+    def put(i):
+        # Half the writers race on the same key, half get their own.
+        key = "traneyes/shared.pdf" if i % 2 else f"traneyes/d{i}.pdf"
+        return store.put(key, payloads[i])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        locations = list(pool.map(put, range(16)))
+
+    assert locations[0] == os.path.join(str(tmp_path), "traneyes", "d0.pdf")
+    for i in range(0, 16, 2):
+        with open(locations[i], "rb") as f:
+            assert f.read() == payloads[i]
+    with open(locations[1], "rb") as f:
+        assert f.read() in payloads[1::2]
+    assert not [name for name in os.listdir(tmp_path / "traneyes") if name.endswith(".part")]
+
+
+def test_render_and_record_skips_only_unchanged_renders(fake_db, tmp_path, monkeypatch):
+    forms = {doc_id: {"employeeInformation": {"fullName": doc_id}} for doc_id in ("a", "b", "c", "d")}
+    for doc_id, data in forms.items():
+        fake_db.add_form(doc_id, data)
+    current = {doc_id: real.form_version(data) for doc_id, data in forms.items()}
+    # a: up to date. b: older template. c: form edited since its render. d: never rendered.
+    fake_db.docs[f"{RENDERS}/a"] = {"status": "rendered", "templateHash": "v1", "formVersion": current["a"]}
+    fake_db.docs[f"{RENDERS}/b"] = {"status": "rendered", "templateHash": "v0", "formVersion": current["b"]}
+    fake_db.docs[f"{RENDERS}/c"] = {"status": "rendered", "templateHash": "v1", "formVersion": "before-edit"}
+
+    rendered = []
+
+    def fake_render_forms(docs, window):
+        for doc_id, _ in docs:
+            rendered.append(doc_id)
+            yield doc_id, b"%PDF-" + doc_id.encode(), None, 0.01
+
+    monkeypatch.setattr(results, "render_forms", fake_render_forms)
+    monkeypatch.setattr(results, "template_hash", lambda path=None: "v1")
+
+    counts = results.render_and_record(store=results.LocalArtifactStore(tmp_path))
+
+    assert counts == (3, 0, 1)
+    assert rendered == ["b", "c", "d"]
+    assert fake_db.docs[f"{RENDERS}/b"]["templateHash"] == "v1"
+    assert fake_db.docs[f"{RENDERS}/c"]["formVersion"] == current["c"]
+    assert fake_db.commits == [3]
+
+    sink = results.ResultSink(db=fake_db, flush_interval=3600)
+    assert sink.rendered_location("c", "v1", current["c"]) == os.path.join(str(tmp_path), "traneyes", "c.pdf")
+    assert sink.rendered_location("c", "v1", "before-edit") is None
+    sink.close()
+
+
+def test_record_never_raises_when_commits_fail(fake_db, monkeypatch):
+    def fail(self):
+        raise RuntimeError("503 Firestore unavailable")
+
+    monkeypatch.setattr(type(fake_db.batch()), "commit", fail)
+    sink = results.ResultSink(db=fake_db, batch_size=2, flush_interval=3600, max_pending=5)
+    for i in range(8):
+        sink.record(f"d{i}", "rendered", f"/out/d{i}.pdf", "abc", 0.1)
+    sink.close()
+
+    # The newest results are kept for retry; the overflow is counted.
+    assert [doc_id for doc_id, _ in sink.pending] == ["d3", "d4", "d5", "d6", "d7"]
+    assert sink.dropped == 3
+    assert fake_db.commits == []
+
+    monkeypatch.undo()
+    sink.flush()
+    assert fake_db.commits == [2, 2, 1]
+
+
+def test_get_sink_rejects_unknown_offices(fake_db, monkeypatch):
+    monkeypatch.setenv("MEDDOC_OFFICES", "traneyes, eastside")
+    with pytest.raises(ValueError):
+        results.get_sink("attacker-chosen")
+    assert "attacker-chosen" not in results._sinks
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pc = pytest.importorskip("pyarrow.compute")
+
+import snapshot  # noqa: E402
+
+T0 = datetime(2025, 1, 6, 9, 0, tzinfo=timezone.utc)  # a Monday
+
+
+def form(name, serious, submitted, updated):
+    return {
+        "submissionMetadata": {
+            "submittedAt": submitted.isoformat().replace("+00:00", "Z"),
+            "serverUpdatedAt": updated,
+        },
+        "employeeInformation": {"fullName": name},
+        "patientInformation": {"isFamilyMember": "No"},
+        "medicalCondition": {"isSeriousHealthCondition": "Yes" if serious else "No"},
+    }
+
+
+def test_incremental_update_upserts_by_doc_id(fake_db, tmp_path):
+    path = str(tmp_path / "snap")
+    fake_db.add_form("a", form("Ann", True, T0, T0))
+    fake_db.add_form("b", form("Bob", False, T0, T0 + timedelta(hours=1)))
+
+    assert snapshot.update_snapshot(path) == 2
+
+    # An edit to "a", a late form with an old browser clock, and a new form.
+    fake_db.add_form("a", form("Ann Edited", False, T0, T0 + timedelta(hours=2)))
+    fake_db.add_form("c", form("Cat", True, T0 - timedelta(days=30), T0 + timedelta(hours=2)))
+    fake_db.add_form("d", form("Dan", True, T0, T0 + timedelta(hours=3)))
+
+    snapshot.update_snapshot(path)
+
+    # The second update only asked for forms since the watermark.
+    _, filters = fake_db.queries[-1]
+    assert [(field, value) for field, _, value in filters] == [
+        ("submissionMetadata.serverUpdatedAt", T0 + timedelta(hours=1) - snapshot.WATERMARK_OVERLAP),
+    ]
+
+    rows = {r["doc_id"]: r for r in snapshot.load_snapshot(path).to_pylist()}
+    assert sorted(rows) == ["a", "b", "c", "d"]
+    assert rows["a"]["name"] == "Ann Edited"
+    assert rows["a"]["serious_condition"] is False
+
+    serious = snapshot.load_snapshot(path, columns=["doc_id"], filter=pc.field("serious_condition"))
+    assert sorted(serious["doc_id"].to_pylist()) == ["c", "d"]
+
+
+def test_weekly_counts(fake_db, tmp_path):
+    path = str(tmp_path / "snap")
+    fake_db.add_form("a", form("Ann", True, T0, T0))
+    fake_db.add_form("b", form("Bob", True, T0 + timedelta(days=2), T0))
+    fake_db.add_form("c", form("Cat", False, T0 + timedelta(days=3), T0))
+    fake_db.add_form("d", form("Dan", True, T0 + timedelta(days=7), T0))
+    snapshot.update_snapshot(path)
+
+    table = snapshot.load_snapshot(path, columns=["doc_id", "submitted_at", "serious_condition"])
+    counts = [
+        (r["week"].date().isoformat(), r["serious_condition"], r["count"])
+        for r in snapshot.weekly_counts(table, "serious_condition").to_pylist()
+    ]
+    assert counts == [
+        ("2025-01-06", False, 1),
+        ("2025-01-06", True, 2),
+        ("2025-01-13", True, 1),
+    ]
+
+
+def test_unchanged_update_writes_nothing(fake_db, tmp_path):
+    path = str(tmp_path / "snap")
+    fake_db.add_form("a", form("Ann", True, T0, T0))
+    snapshot.update_snapshot(path)
+    parts = snapshot._parts(path)
+
+    # "a" is inside the overlap window and comes back unchanged.
+    assert snapshot.update_snapshot(path) == 0
+    assert snapshot._parts(path) == parts
+
+
+def test_falls_back_to_submitted_at_without_server_timestamps(fake_db, tmp_path):
+    path = str(tmp_path / "snap")
+    fake_db.add_form("a", form("Ann", True, T0, None))
+    fake_db.add_form("b", form("Bob", True, T0 - timedelta(days=1), None))
+    snapshot.update_snapshot(path)
+
+    fake_db.add_form("c", form("Cat", False, T0 + timedelta(hours=1), None))
+    assert snapshot.update_snapshot(path) == 1
+
+    _, filters = fake_db.queries[-1]
+    assert [(field, value) for field, _, value in filters] == [
+        ("submissionMetadata.submittedAt", "2025-01-06T08:55:00.000Z"),
+    ]
+    assert sorted(snapshot.load_snapshot(path)["doc_id"].to_pylist()) == ["a", "b", "c"]
+
+
+def test_compaction_keeps_latest_rows_in_one_part(fake_db, tmp_path, monkeypatch):
+    path = str(tmp_path / "snap")
+    monkeypatch.setattr(snapshot, "MAX_PARTS", 2)
+    for hour in range(3):
+        fake_db.add_form("a", form(f"Ann {hour}", True, T0, T0 + timedelta(hours=hour)))
+        fake_db.add_form(f"n{hour}", form("New", False, T0, T0 + timedelta(hours=hour)))
+        snapshot.update_snapshot(path)
+
+    # The third part went over MAX_PARTS and triggered a compaction.
+    assert len(snapshot._parts(path)) == 1
+    rows = {r["doc_id"]: r for r in snapshot.load_snapshot(path).to_pylist()}
+    assert sorted(rows) == ["a", "n0", "n1", "n2"]
+    assert rows["a"]["name"] == "Ann 2"
+    assert snapshot.compact_snapshot(path) == 0
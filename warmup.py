@@ -0,0 +1,91 @@
+"""Worker warm-up and import-time budget.
+
+Use as a gunicorn config so every worker is warm before it takes traffic:
+
+    gunicorn -c warmup.py server:app
+
+or run directly to check that cold imports stay inside the budget:
+
+    python warmup.py --budget-ms 300
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import real
+
+# Modules a server worker imports before it can serve a request.
+WORKER_IMPORTS = ["real", "export", "server"]
+# Command-line tools; they don't run in a worker but should start quickly too.
+TOOL_IMPORTS = ["polly", "snapshot", "results"]
+IMPORT_BUDGET_MS = 300
+
+
+def warm_up(base_pdf=real.BASE_PDF, connect=True):
+    """Pay the one-off costs up front: PDF libraries, template, fill plans, Firestore client."""
+    start = time.perf_counter()
+
+    import pdfscraper  # pulls in pdfplumber, PyPDF2 + reportlab
+
+    pdfscraper.load_template(base_pdf)
+    for is_adult in (True, False):
+        pdfscraper.name_field_plan(base_pdf, is_adult)
+
+    if connect:
+        real.get_db()
+
+    print(f"🔥 Worker warm in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def measure_import(module):
+    """Import time of `module` in a fresh interpreter, in milliseconds.
+
+    Raises subprocess.CalledProcessError if the import fails.
+    """
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def check_import_budget(modules=WORKER_IMPORTS + TOOL_IMPORTS, budget_ms=IMPORT_BUDGET_MS):
+    """Return the modules whose cold import exceeds budget_ms (or fails)."""
+    over = []
+    for module in modules:
+        try:
+            elapsed = measure_import(module)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ import {module} failed:\n{e.stderr.rstrip()}")
+            over.append(module)
+            continue
+        status = "✅" if elapsed <= budget_ms else "❌"
+        print(f"{status} import {module}: {elapsed:.0f} ms (budget {budget_ms} ms)")
+        if elapsed > budget_ms:
+            over.append(module)
+    return over
+
+
+# ---------------------------
+# gunicorn hooks
+# ---------------------------
+def post_worker_init(worker):
+    warm_up()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check cold-start import budget.")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("modules", nargs="*", default=WORKER_IMPORTS + TOOL_IMPORTS)
+    args = parser.parse_args()
+    sys.exit(1 if check_import_budget(args.modules, args.budget_ms) else 0)